@@ -8,7 +8,8 @@ The server just relays bytes once, then deletes the staged file and exits.
 Three client modes are always printed:
   1) Plain Bash (/dev/tcp)
   2) Plain Bash + sha256sum
-  3) Encrypted (openssl enc -aes-256-cbc -pbkdf2) + sha256sum
+  3) Encrypted (openssl enc -aes-256-ctr -pbkdf2) + sha256sum
+  4) Compressed (pigz) + Encrypted + sha256sum
 
 Usage:
   ./bashdrop-server.py <public-host-or-ip> [-p port] [filename] [password]
@@ -21,11 +22,15 @@ Defaults:
 
 import os
 import sys
+import json
+import fcntl
+import mmap
 import socket
 import tempfile
-import secrets
 import string
 import shutil
+import signal
+import selectors
 import time
 import argparse
 
@@ -33,7 +38,9 @@ import argparse
 # Tunables
 # ----------------------------
 DEFAULT_PORT = 9000
-CHUNK_SIZE = 131072
+CHUNK_SIZE = 1 << 20
+PIPE_SIZE = 1 << 20  # splice pipe capacity (F_SETPIPE_SZ)
+SOCK_BUF_SIZE = 8 << 20  # SO_RCVBUF/SO_SNDBUF; WAN BDP easily exceeds the kernel default
 PROBE_WAIT = 2.0  # seconds to decide if a connection is "real" (received data) vs. a stray probe
 
 # ----------------------------
@@ -58,19 +65,70 @@ BRIGHT_MAG    = "\033[95m"
 BRIGHT_CYAN   = "\033[96m"
 BRIGHT_WHITE  = "\033[97m"
 
+# When stdout is piped or logged the escape codes are pure noise; blank them
+# all once at import so every f-string below concatenates empty strings.
+if not sys.stdout.isatty():
+    RESET = BOLD = DIM = ""
+    RED = GREEN = YELLOW = BLUE = MAG = CYAN = ""
+    BRIGHT_RED = BRIGHT_GREEN = BRIGHT_YELLOW = BRIGHT_BLUE = ""
+    BRIGHT_MAG = BRIGHT_CYAN = BRIGHT_WHITE = ""
+
 # ----------------------------
 # Helpers
 # ----------------------------
-def listen_once(port: int) -> socket.socket:
-    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+def listen_once(port: int, sockbuf: int = SOCK_BUF_SIZE) -> socket.socket:
+    # Dual-stack: one listener serves v6 and v4-mapped clients alike.
+    try:
+        s = socket.socket(socket.AF_INET6, socket.SOCK_STREAM)
+        try:
+            s.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 0)
+        except OSError:
+            s.close()
+            raise
+        addr = ("::", port)
+    except OSError:
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        addr = ("0.0.0.0", port)
     s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    s.bind(("0.0.0.0", port))
-    s.listen(1)
+    try:
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    except (AttributeError, OSError):
+        pass
+    # Accepted sockets inherit the listener's buffer sizes; set before bind.
+    # Best effort: the BSDs reject requests above kern.ipc.maxsockbuf instead
+    # of clamping like Linux, so halve until one is accepted or give up.
+    for opt in (socket.SO_RCVBUF, socket.SO_SNDBUF):
+        req = sockbuf
+        while req >= 1 << 16:
+            try:
+                s.setsockopt(socket.SOL_SOCKET, opt, req)
+                break
+            except OSError:
+                req >>= 1
+    # Let the sender's SYN carry data, saving an RTT on the first send.
+    try:
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_FASTOPEN, 5)
+    except (AttributeError, OSError):
+        pass
+    s.bind(addr)
+    # Backlog > 1 so concurrent stray probes don't get RSTs while one is handled.
+    s.listen(16)
     return s
 
+# Password alphabet mapping for gen_password: bytes 0..247 fold evenly onto
+# the 62-char alphabet (248 = 4 * 62); 248..255 are discarded to avoid bias.
+_PW_ALPHABET = (string.ascii_letters + string.digits).encode()
+_PW_TABLE = bytes.maketrans(
+    bytes(range(248)),
+    bytes(_PW_ALPHABET[b % 62] for b in range(248)),
+)
+_PW_DISCARD = bytes(range(248, 256))
+
 def gen_password(n: int = 10) -> str:
-    alphabet = string.ascii_letters + string.digits
-    return "".join(secrets.choice(alphabet) for _ in range(n))
+    out = b""
+    while len(out) < n:
+        out += os.urandom(2 * n).translate(_PW_TABLE, _PW_DISCARD)
+    return out[:n].decode()
 
 def term_width(default: int = 100) -> int:
     try:
@@ -78,119 +136,287 @@ def term_width(default: int = 100) -> int:
     except Exception:
         return default
 
-def hr(ch: str = "─", color: str = DIM, pad: int = 0) -> str:
-    w = term_width()
-    line = ch * max(10, w - pad)
-    return f"{color}{line}{RESET}"
+# The terminal is measured exactly once; every border below derives from it.
+WIDTH = term_width()
+_FOOTER_BAR = "─" * (WIDTH - 2)
+_RULE_CACHE = {}
+
+def hr(color: str = DIM) -> str:
+    line = _RULE_CACHE.get(color)
+    if line is None:
+        line = _RULE_CACHE[color] = f"{color}{'─' * max(10, WIDTH)}{RESET}"
+    return line
 
-def box_title(text: str, color: str = BRIGHT_WHITE) -> None:
-    w = term_width()
+def box_title(text: str, color: str = BRIGHT_WHITE) -> str:
     label = f" {text} "
-    side = max(0, (w - len(label) - 2) // 2)
+    side = max(0, (WIDTH - len(label) - 2) // 2)
     left = "─" * side
     right = "─" * side
-    if len(left + label + right) < (w - 2):
+    if len(left + label + right) < (WIDTH - 2):
         right += "─"
-    print(f"{color}┌{left}{label}{right}┐{RESET}")
+    return f"{color}┌{left}{label}{right}┐{RESET}"
+
+def box_footer(color: str = BRIGHT_WHITE) -> str:
+    return f"{color}└{_FOOTER_BAR}┘{RESET}"
 
-def box_footer(color: str = BRIGHT_WHITE) -> None:
-    w = term_width()
-    print(f"{color}└{'─' * (w - 2)}┘{RESET}")
+def mode_header(name: str, color: str) -> str:
+    return f"{color}{BOLD}[{name}]{RESET}"
 
-def mode_header(name: str, color: str) -> None:
-    print(f"{color}{BOLD}[{name}]{RESET}")
+def cmd_block(cmd: str) -> list:
+    line = hr()
+    return [line, cmd, line]
 
-def cmd_block(cmd: str, color: str = BRIGHT_WHITE) -> None:
-    print(hr("─", color=DIM))
-    print(cmd)
-    print(hr("─", color=DIM))
+def info_kv(k: str, v: str, k_color: str = DIM, v_color: str = BRIGHT_WHITE) -> str:
+    return f"{k_color}{k}:{RESET} {v_color}{v}{RESET}"
 
-def info_kv(k: str, v: str, k_color: str = DIM, v_color: str = BRIGHT_WHITE) -> None:
-    print(f"{k_color}{k}:{RESET} {v_color}{v}{RESET}")
+def write_section(lines: list) -> None:
+    # One write per section instead of one per line.
+    sys.stdout.write("\n".join(lines) + "\n")
 
 def banner(pub: str, port: int, bname: str, password: str) -> None:
-    box_title("One-shot relay — upload once → then download once", BRIGHT_GREEN)
-    print(f"{DIM}This server accepts a single upload, then serves that exact content once for download and exits.{RESET}")
-    print()
-    info_kv("Public host/IP", pub)
-    info_kv("Port", str(port))
-    info_kv("Filename", bname)
-    info_kv("Password (encrypted mode)", password)
-    box_footer(BRIGHT_GREEN)
-    print()
+    write_section([
+        box_title("One-shot relay — upload once → then download once", BRIGHT_GREEN),
+        f"{DIM}This server accepts a single upload, then serves that exact content once for download and exits.{RESET}",
+        "",
+        info_kv("Public host/IP", pub),
+        info_kv("Port", str(port)),
+        info_kv("Filename", bname),
+        info_kv("Password (encrypted mode)", password),
+        box_footer(BRIGHT_GREEN),
+        "",
+    ])
 
 def _fn_cmd(body: str, pw: str, file_: str) -> str:
     return f"d(){{ {body} }}; d {pw} {file_}"
 
 def print_sender_commands(pub: str, port: int, bname: str, password: str) -> None:
-    box_title("Sender (SOURCE)", BRIGHT_BLUE)
-    print(f"{DIM}Choose ONE mode and run exactly as shown (bash required for /dev/tcp).{RESET}\n")
-
-    mode_header("Plain", RED)
-    cmd_block(f"cat >/dev/tcp/{pub}/{port} < {bname}")
-    cmd_block(f"bash -c 'cat >\"/dev/tcp/{pub}/{port}\" < \"$1\"' {password} {bname}")
-
-    mode_header("Plain+sha256sum", BRIGHT_YELLOW)
-    cmd_block(_fn_cmd(
-        f'sha256sum "$2" && cat >"/dev/tcp/{pub}/{port}" <"$2";',
-        password, bname
-    ))
-    cmd_block(
-        f"bash -c 'f=\"$1\";sha256sum \"$f\"&&cat >\"/dev/tcp/{pub}/{port}\" < \"$f\"' {password} {bname}"
-    )
+    lines = [
+        box_title("Sender (SOURCE)", BRIGHT_BLUE),
+        f"{DIM}Choose ONE mode and run exactly as shown (bash required for /dev/tcp).{RESET}",
+        "",
+        mode_header("Plain", RED),
+        *cmd_block(f"cat >/dev/tcp/{pub}/{port} < {bname}"),
+        *cmd_block(f"bash -c 'cat >\"/dev/tcp/{pub}/{port}\" < \"$1\"' {password} {bname}"),
+        f"{DIM}Large files: dd writes 1 MiB blocks instead of cat's small stdio buffers"
+        f" (socat -u -b 1048576 FILE:{bname} TCP:{pub}:{port} works too).{RESET}",
+        *cmd_block(f"dd if={bname} bs=1M status=progress >/dev/tcp/{pub}/{port}"),
+        mode_header("Plain+sha256sum", BRIGHT_YELLOW),
+        *cmd_block(_fn_cmd(
+            f'sha256sum "$2" && cat >"/dev/tcp/{pub}/{port}" <"$2";',
+            password, bname
+        )),
+        *cmd_block(
+            f"bash -c 'f=\"$1\";sha256sum \"$f\"&&cat >\"/dev/tcp/{pub}/{port}\" < \"$f\"' {password} {bname}"
+        ),
+        mode_header("Encrypted+sha256sum", BRIGHT_CYAN),
+        *cmd_block(_fn_cmd(
+            f'sha256sum "$2" && openssl enc -aes-256-ctr -pbkdf2 -salt -pass pass:$1 <"$2" >\"/dev/tcp/{pub}/{port}\";',
+            password, bname
+        )),
+        *cmd_block(
+            "bash -c '"
+            "f=\"$1\";sha256sum \"$f\"&&"
+            f"openssl enc -aes-256-ctr -pbkdf2 -salt -pass pass:\"$0\" < \"$f\" >\"/dev/tcp/{pub}/{port}\""
+            f"' {password} {bname}"
+        ),
+        mode_header("Compressed+Encrypted+sha256sum", BRIGHT_MAG),
+        f"{DIM}pigz compresses on all cores — trades CPU for bandwidth on compressible files.{RESET}",
+        *cmd_block(_fn_cmd(
+            f'sha256sum "$2" && pigz -c "$2" | openssl enc -aes-256-ctr -pbkdf2 -salt -pass pass:$1 >"/dev/tcp/{pub}/{port}";',
+            password, bname
+        )),
+        *cmd_block(
+            "bash -c '"
+            "f=\"$1\";sha256sum \"$f\"&&"
+            f"pigz -c \"$f\"|openssl enc -aes-256-ctr -pbkdf2 -salt -pass pass:\"$0\" >\"/dev/tcp/{pub}/{port}\""
+            f"' {password} {bname}"
+        ),
+        box_footer(BRIGHT_BLUE),
+        "",
+    ]
+    write_section(lines)
 
-    mode_header("Encrypted+sha256sum", BRIGHT_CYAN)
-    cmd_block(_fn_cmd(
-        f'sha256sum "$2" && openssl enc -aes-256-cbc -pbkdf2 -salt -pass pass:$1 <"$2" >\"/dev/tcp/{pub}/{port}\";',
-        password, bname
-    ))
-    cmd_block(
-        "bash -c '"
-        "f=\"$1\";sha256sum \"$f\"&&"
-        f"openssl enc -aes-256-cbc -pbkdf2 -salt -pass pass:\"$0\" < \"$f\" >\"/dev/tcp/{pub}/{port}\""
-        f"' {password} {bname}"
-    )
+def print_receiver_commands(pub: str, port: int, bname: str, password: str) -> None:
+    lines = [
+        box_title("Receiver (DESTINATION) — run AFTER upload completes", BRIGHT_MAG),
+        f"{DIM}Again, choose ONE mode. Start these only after the sender finishes the upload step.{RESET}",
+        "",
+        mode_header("Plain", RED),
+        *cmd_block(f"cat </dev/tcp/{pub}/{port} > {bname}"),
+        *cmd_block(f"bash -c 'cat <\"/dev/tcp/{pub}/{port}\" > \"$1\"' {password} {bname}"),
+        f"{DIM}Large files: 1 MiB blocks (iflag=fullblock keeps short socket reads from shrinking them).{RESET}",
+        *cmd_block(f"dd of={bname} bs=1M iflag=fullblock status=progress </dev/tcp/{pub}/{port}"),
+        mode_header("Plain+sha256sum", BRIGHT_YELLOW),
+        *cmd_block(_fn_cmd(
+            f'cat <"/dev/tcp/{pub}/{port}" >"$2" && sha256sum "$2";',
+            password, bname
+        )),
+        *cmd_block(
+            f"bash -c 'f=\"$1\";cat <\"/dev/tcp/{pub}/{port}\" > \"$f\"&&sha256sum \"$f\"' {password} {bname}"
+        ),
+        mode_header("Encrypted+sha256sum", BRIGHT_CYAN),
+        *cmd_block(_fn_cmd(
+            f'openssl enc -d -aes-256-ctr -pbkdf2 -pass pass:$1 <"/dev/tcp/{pub}/{port}" >"$2" && sha256sum "$2";',
+            password, bname
+        )),
+        *cmd_block(
+            "bash -c '"
+            f"f=\"$1\";openssl enc -d -aes-256-ctr -pbkdf2 -pass pass:\"$0\" < \"/dev/tcp/{pub}/{port}\" > \"$f\"&&sha256sum \"$f\""
+            f"' {password} {bname}"
+        ),
+        mode_header("Compressed+Encrypted+sha256sum", BRIGHT_MAG),
+        *cmd_block(_fn_cmd(
+            f'openssl enc -d -aes-256-ctr -pbkdf2 -pass pass:$1 <"/dev/tcp/{pub}/{port}" | pigz -dc >"$2" && sha256sum "$2";',
+            password, bname
+        )),
+        *cmd_block(
+            "bash -c '"
+            f"f=\"$1\";openssl enc -d -aes-256-ctr -pbkdf2 -pass pass:\"$0\" < \"/dev/tcp/{pub}/{port}\"|pigz -dc > \"$f\"&&sha256sum \"$f\""
+            f"' {password} {bname}"
+        ),
+        box_footer(BRIGHT_CYAN),
+        "",
+    ]
+    write_section(lines)
+
+def _sigterm(signum, frame):
+    # Unwind like Ctrl-C so the normal cleanup paths run.
+    raise KeyboardInterrupt
+
+def accept_conn(sock: socket.socket, timeout=None):
+    """Accept one connection via a selector instead of a blocking accept.
+
+    select() is interrupted cleanly by SIGINT/SIGTERM (the handlers
+    raise), so shutdown no longer races a blocking accept. Returns the
+    accepted connection in blocking mode, or None once `timeout` seconds
+    pass without one.
+    """
+    sock.setblocking(False)
+    try:
+        with selectors.DefaultSelector() as sel:
+            sel.register(sock, selectors.EVENT_READ)
+            deadline = None if timeout is None else time.time() + timeout
+            while True:
+                wait = None if deadline is None else max(0.0, deadline - time.time())
+                if sel.select(wait):
+                    try:
+                        conn, _ = sock.accept()
+                    except BlockingIOError:
+                        continue
+                    conn.setblocking(True)
+                    return conn
+                if deadline is not None and time.time() >= deadline:
+                    return None
+    finally:
+        sock.setblocking(True)
+
+def create_staged(on_disk: bool = False) -> tuple:
+    """Create the staging file, returning (fd, tmp_dir).
+
+    Prefers memfd_create: the payload is staged in anonymous memory, so
+    the upload→download round trip never touches disk bandwidth.
+    --on-disk (or a platform without memfd) drops to an anonymous
+    O_TMPFILE inode, then to a named file in a private temp directory;
+    only that last case sets tmp_dir (otherwise None), which the caller
+    must clean up.
+    """
+    if not on_disk:
+        try:
+            return os.memfd_create("bashdrop-stage", os.MFD_CLOEXEC), None
+        except (AttributeError, OSError):
+            pass
+    if hasattr(os, "O_TMPFILE"):
+        try:
+            return os.open(tempfile.gettempdir(), os.O_TMPFILE | os.O_RDWR, 0o600), None
+        except OSError:
+            pass
+    tmp_dir = tempfile.mkdtemp(prefix="bashdrop_stage_")
+    fd = os.open(os.path.join(tmp_dir, "file"), os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+    return fd, tmp_dir
 
-    box_footer(BRIGHT_BLUE)
-    print()
+def cleanup_staged(staged_fd, tmp_dir) -> None:
+    try:
+        os.close(staged_fd)
+    except Exception:
+        pass
+    if tmp_dir is not None:
+        try:
+            os.remove(os.path.join(tmp_dir, "file"))
+        except Exception:
+            pass
+        try:
+            os.rmdir(tmp_dir)
+        except Exception:
+            pass
 
-def print_receiver_commands(pub: str, port: int, bname: str, password: str) -> None:
-    box_title("Receiver (DESTINATION) — run AFTER upload completes", BRIGHT_MAG)
-    print(f"{DIM}Again, choose ONE mode. Start these only after the sender finishes the upload step.{RESET}\n")
-
-    mode_header("Plain", RED)
-    cmd_block(f"cat </dev/tcp/{pub}/{port} > {bname}")
-    cmd_block(f"bash -c 'cat <\"/dev/tcp/{pub}/{port}\" > \"$1\"' {password} {bname}")
-
-    mode_header("Plain+sha256sum", BRIGHT_YELLOW)
-    cmd_block(_fn_cmd(
-        f'cat <"/dev/tcp/{pub}/{port}" >"$2" && sha256sum "$2";',
-        password, bname
-    ))
-    cmd_block(
-        f"bash -c 'f=\"$1\";cat <\"/dev/tcp/{pub}/{port}\" > \"$f\"&&sha256sum \"$f\"' {password} {bname}"
-    )
+def _splice_from_socket(conn: socket.socket, out_fd: int) -> int:
+    """Relay socket → fd entirely in kernel space via splice(2).
 
-    mode_header("Encrypted+sha256sum", BRIGHT_CYAN)
-    cmd_block(_fn_cmd(
-        f'openssl enc -d -aes-256-cbc -pbkdf2 -pass pass:$1 <"/dev/tcp/{pub}/{port}" >"$2" && sha256sum "$2";',
-        password, bname
-    ))
-    cmd_block(
-        "bash -c '"
-        f"f=\"$1\";openssl enc -d -aes-256-cbc -pbkdf2 -pass pass:\"$0\" < \"/dev/tcp/{pub}/{port}\" > \"$f\"&&sha256sum \"$f\""
-        f"' {password} {bname}"
-    )
+    Pages move by reference (socket → pipe → out_fd) without ever being
+    copied into user space; out_fd may be a file or another socket.
+    Returns the number of bytes relayed.
+    """
+    pipe_r, pipe_w = os.pipe()
+    total = 0
+    try:
+        try:
+            fcntl.fcntl(pipe_w, fcntl.F_SETPIPE_SZ, PIPE_SIZE)
+        except OSError:
+            pass  # pipe-max-size may be lower; the default capacity still works
+        while True:
+            n = os.splice(conn.fileno(), pipe_w, PIPE_SIZE)
+            if n == 0:
+                break
+            total += n
+            while n > 0:
+                n -= os.splice(pipe_r, out_fd, n)
+    finally:
+        os.close(pipe_r)
+        os.close(pipe_w)
+    return total
 
-    box_footer(BRIGHT_CYAN)
-    print()
+def _sendall_mmap(conn: socket.socket, f) -> None:
+    """Send an open file over a socket via a read-only mapping.
 
-def accept_upload(staged_path: str, port: int) -> int:
-    up_sock = listen_once(port)
+    One sendall over the mapping avoids allocating a fresh bytes object
+    per chunk and the kernel→user read copy. Falls back to the chunked
+    read loop when the file cannot be mapped (e.g. it is empty).
+    """
+    try:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        mv = memoryview(bytearray(CHUNK_SIZE))
+        while True:
+            n = f.readinto(mv)
+            if not n:
+                break
+            conn.sendall(mv[:n])
+        return
+    try:
+        try:
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+        except (AttributeError, OSError):
+            pass
+        conn.sendall(mm)
+    finally:
+        mm.close()
+
+def accept_upload(staged_fd: int, sock: socket.socket, wait_timeout=None) -> int:
+    # Only surface connections that already have data queued during this
+    # phase, so the stray-probe timeout rarely runs its full course. The
+    # kernel still hands over data-less connections after the defer window,
+    # so the probe below stays as the portable guard — and the option is
+    # cleared on exit because the download client never sends anything.
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_DEFER_ACCEPT, int(PROBE_WAIT))
+    except (AttributeError, OSError):
+        pass
     size = 0
     try:
         while True:
-            conn, _ = up_sock.accept()
+            conn = accept_conn(sock, wait_timeout)
+            if conn is None:
+                raise TimeoutError(f"no sender connected within {wait_timeout:.0f}s")
             try:
                 conn.settimeout(PROBE_WAIT)
                 try:
@@ -203,15 +429,26 @@ def accept_upload(staged_path: str, port: int) -> int:
                     conn.close()
                     continue
 
-                with open(staged_path, "wb") as f:
+                # Start every attempt from a clean file; a previous accepted
+                # connection may have died mid-upload.
+                size = 0
+                os.ftruncate(staged_fd, 0)
+                os.lseek(staged_fd, 0, os.SEEK_SET)
+                with os.fdopen(os.dup(staged_fd), "wb") as f:
                     f.write(first_chunk)
                     size += len(first_chunk)
-                    while True:
-                        data = conn.recv(CHUNK_SIZE)
-                        if not data:
-                            break
-                        f.write(data)
-                        size += len(data)
+                    if hasattr(os, "splice"):
+                        f.flush()
+                        size += _splice_from_socket(conn, f.fileno())
+                    else:
+                        # One reusable buffer instead of a fresh bytes per recv.
+                        mv = memoryview(bytearray(CHUNK_SIZE))
+                        while True:
+                            n = conn.recv_into(mv)
+                            if not n:
+                                break
+                            f.write(mv[:n])
+                            size += n
                 conn.close()
                 break
             except Exception:
@@ -222,32 +459,90 @@ def accept_upload(staged_path: str, port: int) -> int:
                 continue
     finally:
         try:
-            up_sock.close()
-        except Exception:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_DEFER_ACCEPT, 0)
+        except (AttributeError, OSError):
             pass
     return size
 
-def serve_download(staged_path: str, port: int) -> None:
-    down_sock = listen_once(port)
-    try:
-        conn, _ = down_sock.accept()
-        with conn:
-            with open(staged_path, "rb") as f:
-                while True:
-                    chunk = f.read(CHUNK_SIZE)
-                    if not chunk:
-                        break
-                    conn.sendall(chunk)
+def serve_download(staged_fd: int, sock: socket.socket) -> None:
+    conn = accept_conn(sock)
+    with conn:
+        # Let the kernel coalesce full-sized segments for the whole payload.
+        try:
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_CORK, 1)
+        except (AttributeError, OSError):
+            pass
+        os.lseek(staged_fd, 0, os.SEEK_SET)
+        with os.fdopen(os.dup(staged_fd), "rb") as f:
+            # One straight read of the whole file: widen the readahead.
             try:
-                conn.shutdown(socket.SHUT_WR)
-            except Exception:
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            except (AttributeError, OSError):
                 pass
-    finally:
+            if hasattr(os, "sendfile"):
+                # Zero-copy: pages go straight from the page cache into the
+                # TCP stack without ever crossing into user space.
+                offset = 0
+                remaining = os.fstat(f.fileno()).st_size
+                while remaining > 0:
+                    sent = os.sendfile(conn.fileno(), f.fileno(), offset, remaining)
+                    if sent == 0:
+                        break
+                    offset += sent
+                    remaining -= sent
+            else:
+                _sendall_mmap(conn, f)
         try:
-            down_sock.close()
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_CORK, 0)
+        except (AttributeError, OSError):
+            pass
+        try:
+            conn.shutdown(socket.SHUT_WR)
         except Exception:
             pass
 
+def relay_once(sock: socket.socket, wait_timeout=None) -> int:
+    """Accept the sender, then the receiver, and relay socket → socket.
+
+    Nothing is staged: with splice(2) the payload moves sender → pipe →
+    receiver entirely inside the kernel. The receiver has to connect
+    while the sender is still uploading; TCP flow control throttles the
+    sender until it does.
+    """
+    size = 0
+    while True:
+        up_conn = accept_conn(sock, wait_timeout)
+        if up_conn is None:
+            raise TimeoutError(f"no sender connected within {wait_timeout:.0f}s")
+        up_conn.settimeout(PROBE_WAIT)
+        try:
+            first_chunk = up_conn.recv(CHUNK_SIZE)
+        except socket.timeout:
+            first_chunk = b""
+        up_conn.settimeout(None)
+        if first_chunk:
+            break
+        up_conn.close()
+    down_conn = accept_conn(sock)
+    with up_conn, down_conn:
+        down_conn.sendall(first_chunk)
+        size += len(first_chunk)
+        if hasattr(os, "splice"):
+            size += _splice_from_socket(up_conn, down_conn.fileno())
+        else:
+            mv = memoryview(bytearray(CHUNK_SIZE))
+            while True:
+                n = up_conn.recv_into(mv)
+                if not n:
+                    break
+                down_conn.sendall(mv[:n])
+                size += n
+        try:
+            down_conn.shutdown(socket.SHUT_WR)
+        except Exception:
+            pass
+    return size
+
 def main():
     parser = argparse.ArgumentParser(
         description="One-shot relay: upload once, then download once."
@@ -256,62 +551,108 @@ def main():
     parser.add_argument("filename", nargs="?", default="file", help="Filename for file")
     parser.add_argument("password", nargs="?", help="Password for encrypted mode")
     parser.add_argument("-p", "--port", type=int, default=DEFAULT_PORT, help="Port to listen on (default: 9000)")
+    parser.add_argument("--sockbuf", type=int, default=SOCK_BUF_SIZE,
+                        help=f"SO_RCVBUF/SO_SNDBUF size in bytes (default: {SOCK_BUF_SIZE})")
+    parser.add_argument("--relay", action="store_true",
+                        help="Relay sender → receiver directly without staging to disk "
+                             "(the receiver must connect while the sender is uploading)")
+    parser.add_argument("--on-disk", action="store_true",
+                        help="Stage the upload in a temp file instead of RAM "
+                             "(for payloads that may not fit in memory)")
+    parser.add_argument("--wait-timeout", type=float, default=None, metavar="SECS",
+                        help="Exit if no sender connects within SECS seconds "
+                             "(default: wait forever)")
+    parser.add_argument("--quiet", action="store_true",
+                        help="Skip the banner and command boxes; print one JSON line "
+                             "with the connection details instead (for scripted use)")
     args = parser.parse_args()
 
+    signal.signal(signal.SIGTERM, _sigterm)
+
     pub = args.pub
     bname = args.filename
     password = args.password if args.password else gen_password(10)
     port = args.port
 
-    tmp_dir = tempfile.mkdtemp(prefix="bashdrop_stage_")
-    staged_path = os.path.join(tmp_dir, "file")
-
-    print()
-    banner(pub, port, bname, password)
-
-    print_sender_commands(pub, port, bname, password)
-    print_receiver_commands(pub, port, bname, password)
-
-    box_title("Waiting for upload…", BRIGHT_WHITE)
-    print(f"{DIM}Listening on 0.0.0.0:{port}. The first client that sends data within ~{PROBE_WAIT:.0f}s will be treated as the sender.{RESET}")
-    box_footer(BRIGHT_WHITE)
-    t0 = time.time()
+    if args.quiet:
+        # One machine-readable line for scripts, then straight to accept.
+        print(json.dumps({"host": pub, "port": port, "filename": bname,
+                          "password": password}), flush=True)
+    else:
+        print()
+        banner(pub, port, bname, password)
+        print_sender_commands(pub, port, bname, password)
+        print_receiver_commands(pub, port, bname, password)
+
+    # One listener for every phase: the port is bound exactly once and stays
+    # bound between upload and download, so the second socket setup and its
+    # potential TIME_WAIT bind race are gone.
+    sock = listen_once(port, args.sockbuf)
     try:
-        size = accept_upload(staged_path, port)
-        dt = time.time() - t0
-        print(f"{BRIGHT_GREEN}Upload complete:{RESET} {size} bytes stored temporarily ({dt:.1f}s).")
-    except KeyboardInterrupt:
-        print(f"{BRIGHT_RED}Interrupted during upload. Exiting.{RESET}")
+        if args.relay:
+            if not args.quiet:
+                write_section([
+                    box_title("Relay mode — waiting for sender, then receiver", BRIGHT_WHITE),
+                    f"{DIM}Listening on port {port} (all interfaces). Start the receiver while the upload runs; nothing touches disk.{RESET}",
+                    box_footer(BRIGHT_WHITE),
+                ])
+            t0 = time.time()
+            try:
+                size = relay_once(sock, args.wait_timeout)
+                dt = time.time() - t0
+                print(f"{BRIGHT_GREEN}Relay complete:{RESET} {size} bytes forwarded ({dt:.1f}s).")
+            except TimeoutError as e:
+                print(f"{BRIGHT_RED}{e}. Exiting.{RESET}")
+                sys.exit(124)
+            except KeyboardInterrupt:
+                print(f"{BRIGHT_RED}Interrupted during relay. Exiting.{RESET}")
+                sys.exit(130)
+            print(f"{BRIGHT_WHITE}Done.{RESET} File relayed once, nothing staged.\n")
+            return
+
+        staged_fd, tmp_dir = create_staged(args.on_disk)
+
+        if not args.quiet:
+            write_section([
+                box_title("Waiting for upload…", BRIGHT_WHITE),
+                f"{DIM}Listening on port {port} (all interfaces). The first client that sends data within ~{PROBE_WAIT:.0f}s will be treated as the sender.{RESET}",
+                box_footer(BRIGHT_WHITE),
+            ])
+        t0 = time.time()
         try:
-            os.remove(staged_path)
-        except Exception:
-            pass
+            size = accept_upload(staged_fd, sock, args.wait_timeout)
+            dt = time.time() - t0
+            print(f"{BRIGHT_GREEN}Upload complete:{RESET} {size} bytes stored temporarily ({dt:.1f}s).")
+        except TimeoutError as e:
+            print(f"{BRIGHT_RED}{e}. Exiting.{RESET}")
+            cleanup_staged(staged_fd, tmp_dir)
+            sys.exit(124)
+        except KeyboardInterrupt:
+            print(f"{BRIGHT_RED}Interrupted during upload. Exiting.{RESET}")
+            cleanup_staged(staged_fd, tmp_dir)
+            sys.exit(130)
+
+        if not args.quiet:
+            write_section([
+                "",
+                box_title("Ready for download — start the receiver now", BRIGHT_WHITE),
+                f"{DIM}Still listening on port {port} (all interfaces). The first client to read will receive the staged file once.{RESET}",
+                box_footer(BRIGHT_WHITE),
+            ])
         try:
-            os.rmdir(tmp_dir)
-        except Exception:
-            pass
-        sys.exit(130)
-
-    print()
-    box_title("Ready for download — start the receiver now", BRIGHT_WHITE)
-    print(f"{DIM}Listening again on 0.0.0.0:{port}. The first client to read will receive the staged file once.{RESET}")
-    box_footer(BRIGHT_WHITE)
-    try:
-        serve_download(staged_path, port)
-        print(f"{BRIGHT_GREEN}Download complete.{RESET} Cleaning up.")
-    except KeyboardInterrupt:
-        print(f"{BRIGHT_RED}Interrupted during download. Cleaning up.{RESET}")
+            serve_download(staged_fd, sock)
+            print(f"{BRIGHT_GREEN}Download complete.{RESET} Cleaning up.")
+        except KeyboardInterrupt:
+            print(f"{BRIGHT_RED}Interrupted during download. Cleaning up.{RESET}")
 
-    try:
-        os.remove(staged_path)
-    except Exception:
-        pass
-    try:
-        os.rmdir(tmp_dir)
-    except Exception:
-        pass
+        cleanup_staged(staged_fd, tmp_dir)
 
-    print(f"{BRIGHT_WHITE}Done.{RESET} File served once and removed.\n")
+        print(f"{BRIGHT_WHITE}Done.{RESET} File served once and removed.\n")
+    finally:
+        try:
+            sock.close()
+        except Exception:
+            pass
 
 if __name__ == "__main__":
     main()